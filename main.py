@@ -4,153 +4,286 @@
 # моделей через llama.cpp. Алгоритм разбивает текст на чанки, создает суммаризации,
 # а затем рекурсивно объединяет их в связное повествование.
 
+import functools
+import hashlib
+import io
+import json
+import multiprocessing
 import os
 import re
 import time
+from collections import deque
+from contextlib import ExitStack
 from llama_cpp import Llama
-from typing import List
+from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
 
-# Загрузка модели (замени на свой путь к файлу модели)
+# Путь к модели (замени на свой путь к файлу модели)
 model_path = r"G:\LLM_models2\Grok-3-reasoning-gemma3-12B-distilled-HF.Q8_0.gguf"
-llm = Llama(
-    model_path=model_path,
-    chat_format="gemma",  # Или попробуй "chatml" для лучшей совместимости
-    n_ctx=32768,
-    n_threads=8,
-    n_gpu_layers=47,
-    temperature=0.1,
-    max_tokens=8192,
-    verbose=True
-)
+n_threads = min(16, os.cpu_count() or 8)  # Число потоков CPU по числу ядер, но не больше 16
+
+# Количество процессов для суммаризации чанков и групп иерархии. Каждый процесс загружает свою копию модели,
+# поэтому увеличивай значение, только если хватает памяти (VRAM) на несколько копий.
+n_workers = 1
+
+# Спекулятивное декодирование через поиск n-грамм в промпте (без отдельной draft-модели):
+# сколько токенов предлагать за шаг, 0 — выключено. Суммаризации во многом повторяют фразы
+# из входного текста, поэтому проверка нескольких токенов за один проход ускоряет генерацию.
+# ВНИМАНИЕ: для проверки черновиков нужны логиты всех позиций, поэтому модель загружается
+# с logits_all=True, и llama-cpp-python выделяет буфер n_ctx x размер словаря float32
+# (для gemma3 при n_ctx=32768 это ~34 ГБ, при n_ctx=8192 — ~8.6 ГБ). Включай только вместе
+# с уменьшением n_ctx в load_model().
+prompt_lookup_tokens = 0
+# Максимальная длина n-граммы для поиска в промпте (поиск идёт от неё до 1); действует только
+# при prompt_lookup_tokens > 0 (см. ограничение на n_ctx выше). Длинные совпадения
+# дают более точные черновики, когда ответ почти дословно повторяет вход: перепись английской
+# суммаризации на русском и иерархические сводки, пересказывающие суммаризации группы.
+prompt_lookup_ngram = 4
+
+# Модель текущего процесса, загружается функцией load_model()
+llm = None
+
+
+def load_model(threads=None):
+    """
+    Загрузка модели в глобальную переменную llm текущего процесса (также инициализатор пула процессов).
+
+    :param threads: Число потоков CPU для модели; пул передаёт долю n_threads на процесс,
+                    основной процесс использует все n_threads
+    """
+    global llm
+    threads = threads or n_threads
+
+    draft_model = None
+    if prompt_lookup_tokens:
+        draft_model = LlamaPromptLookupDecoding(max_ngram_size=prompt_lookup_ngram,
+                                                num_pred_tokens=prompt_lookup_tokens)
+
+    llm = Llama(
+        model_path=model_path,
+        chat_format="gemma",  # Или попробуй "chatml" для лучшей совместимости
+        n_ctx=32768,
+        n_batch=2048,  # Крупные батчи ускоряют обработку длинных промптов; при нехватке VRAM уменьши n_ubatch до 256
+        n_ubatch=512,
+        n_threads=threads,
+        n_threads_batch=threads,
+        n_gpu_layers=47,
+        temperature=0.1,
+        max_tokens=8192,
+        draft_model=draft_model,
+        # С draft_model llama-cpp-python включает logits_all только в контексте, а буфер логитов
+        # размечает по этому аргументу; без явного флага он остаётся на n_batch строк и eval() падает
+        logits_all=draft_model is not None,
+        verbose=True
+    )
+    return llm
+
+
+# Регулярные выражения для clean_model_output компилируются один раз при загрузке модуля
+# Блоки <think>...</think> и другие возможные теги рассуждений (порядок проходов важен)
+_TAG_RES = tuple(re.compile(p, re.DOTALL) for p in (
+    r'<think>.*?</think>',
+    r'<reasoning>.*?</reasoning>',
+    r'<reflection>.*?</reflection>',
+    r'<scratchpad>.*?</scratchpad>',
+))
+
+# Фразы типа "Let me think", "Ok" и т.д.
+_THINK_RES = tuple(re.compile(p, re.IGNORECASE | re.DOTALL) for p in (
+    r'Ok, let me think.*?\n\n',
+    r'Let me see.*?\n\n',
+    r'Let me figure this out.*?\n\n',
+    r'First,.*?\n\n',
+    r'I need to.*?\n\n',
+    r'So,.*?\n\n',
+    r'Alright,.*?\n\n',
+    r'Okay,.*?\n\n',
+))
+
+# Лишние пустые строки
+_BLANK = re.compile(r'\n\s*\n\s*\n')
 
 
 def clean_model_output(text):
     """
     Очистка вывода модели от внутренних рассуждений и служебных тегов.
     """
-    # Удаляем блоки <think>...</think>
-    text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL)
-
-    # Удаляем другие возможные теги рассуждений
-    text = re.sub(r'<reasoning>.*?</reasoning>', '', text, flags=re.DOTALL)
-    text = re.sub(r'<reflection>.*?</reflection>', '', text, flags=re.DOTALL)
-    text = re.sub(r'<scratchpad>.*?</scratchpad>', '', text, flags=re.DOTALL)
+    # Удаляем блоки <think>...</think> и другие теги рассуждений
+    for pattern in _TAG_RES:
+        text = pattern.sub('', text)
 
     # Удаляем фразы типа "Let me think", "Ok" и т.д.
-    thinking_patterns = [
-        r'Ok, let me think.*?\n\n',
-        r'Let me see.*?\n\n',
-        r'Let me figure this out.*?\n\n',
-        r'First,.*?\n\n',
-        r'I need to.*?\n\n',
-        r'So,.*?\n\n',
-        r'Alright,.*?\n\n',
-        r'Okay,.*?\n\n',
-    ]
-
-    for pattern in thinking_patterns:
-        text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.DOTALL)
+    for pattern in _THINK_RES:
+        text = pattern.sub('', text)
 
     # Удаляем лишние пустые строки
-    text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
+    text = _BLANK.sub('\n\n', text)
 
     return text.strip()
 
 
-def combine_into_narrative(llm, text_list: List[str]) -> str:
-    """
-    Функция принимает список строк и использует модель LLM для объединения их в одно связное повествование.
+# Системные сообщения создаются один раз и переиспользуются во всех запросах к модели
+# Суммаризация чанка
+SYS_SUMMARIZE = {"role": "system",
+                 "content": """Ты — русскоязычный ассистент. Все ответы давай на русском языке. 
+                                 Не используй английский. Используй ТОЛЬКО Фрагмент ниже.
+                                 ВАЖНО: Не используй теги <think>, <reasoning> или другие мета-рассуждения.
+                                 Не объясняй свои мысли. Просто дай суммаризацию на русском языке."""}
 
-    :param llm: Инициализированная модель Llama (например, llm = Llama(...))
-    :param text_list: Список строк для объединения
-    :return: Один текст, представляющий объединенное повествование
-    """
-    if not text_list:
-        return ""
+# Иерархическая сводка группы
+SYS_HIER = {"role": "system",
+            "content": """Ты — русскоязычный ассистент. Все ответы давай на русском языке. 
+                                     Не используй английский. 
+                                     ВАЖНО: Не используй теги <think>, <reasoning> или другие мета-рассуждения.
+                                     Не объясняй свои мысли. Просто дай суммаризацию."""}
 
-    system_message = {"role": "system",
-                      "content": """Ты — русскоязычный ассистент по обработке текстов.
-                                 Используй только русский язык. Используй ТОЛЬКО контекст ниже.
+# Финальная общая сводка
+SYS_FINAL = {"role": "system",
+             "content": """Ты — русскоязычный ассистент. Все ответы давай на русском языке. 
+                                 Не используй английский. 
                                  ВАЖНО: Не используй теги <think>, <reasoning> или другие мета-рассуждения.
-                                 Просто дай ответ на русском языке."""}
+                                 Не объясняй свои мысли. Просто дай суммаризацию."""}
 
-    cont_list = "".join(text_list)
-    print(f"\n##########\nСписок после объединения через join \n{cont_list[:500]}...")
 
-    messages = [
-        system_message,
-        {"role": "user", "content": f"""Соедини следующий список текстов на русском языке из Контекста в единое связное повествование на русском языке.
-            Обеспечь, чтобы длина вывода была примерно такой же, как длина объединенных входных текстов.
-            НЕ используй теги <think>, <reasoning> или другие мета-рассуждения.
-            Просто дай связный текст на русском языке.
-            Контекст: \n\n{cont_list}"""
-         }
-    ]
+# Каталог для кэша ответов модели (переживает перезапуски программы)
+CACHE_DIR = ".cache"
+
+# Каталог для готовых суммаризаций чанков: при повторном запуске они не пересчитываются.
+# Ключ кэша строится из имени файла модели, PROMPT_VER и текста чанка —
+# увеличь PROMPT_VER после изменения промптов суммаризации чанков.
+CHUNKS_CACHE_DIR = "chunks_cache"
+PROMPT_VER = "v1"
 
+
+def llm_cache(func):
+    """
+    Декоратор для кэширования ответов модели по хэшу запроса.
+
+    Ключ — SHA256 от модели, сообщений, max_tokens, temperature и стоп-последовательностей.
+    Ответы хранятся в памяти процесса и в файлах CACHE_DIR/{hash}.json.
+    """
+    memory = {}
+
+    @functools.wraps(func)
+    def wrapper(llm, messages, max_tokens, temperature, stop):
+        payload = json.dumps([os.path.basename(llm.model_path), messages, max_tokens, temperature, stop],
+                             ensure_ascii=False)
+        key = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+        if key in memory:
+            return memory[key]
+
+        cache_path = os.path.join(CACHE_DIR, f"{key}.json")
+        content = None
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as cache_f:
+                    content = json.load(cache_f)['content']
+            except (OSError, ValueError, KeyError, TypeError):
+                content = None  # Повреждённый файл кэша считаем промахом и перезаписываем
+
+        if content is None:
+            content = func(llm, messages, max_tokens, temperature, stop)
+            # Запись через временный файл (свой у каждого процесса пула), чтобы прерванный запуск
+            # не оставил в кэше обрезанный JSON
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as cache_f:
+                json.dump({'content': content}, cache_f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+
+        memory[key] = content
+        return content
+
+    return wrapper
+
+
+@llm_cache
+def cached_chat_completion(llm, messages, max_tokens, temperature, stop):
+    """Запрос к модели с кэшированием ответа. Возвращает текст ответа или пустую строку."""
     response = llm.create_chat_completion(
         messages=messages,
-        max_tokens=8000,
-        temperature=0.1,
-        stop=["</s>", "Human:", "<think>", "<reasoning>", "<scratchpad>"]
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stop=stop
     )
 
     if response['choices']:
-        result = response['choices'][0]['message']['content'].strip()
-        # Очищаем вывод от внутренних рассуждений
-        result = clean_model_output(result)
-        return result
-    else:
-        return ""
+        return response['choices'][0]['message']['content'].strip()
+    return ""
+
+
+# Специальные символы, кроме базовых (серии удаляются за одну замену)
+_SPECIAL_CHARS = re.compile(r'[^\w\s.,!?—–-]+')
 
 
 def clean_text(text):
     """Очистка текста от лишних символов и форматирования."""
-    text = re.sub(r'\s+', ' ', text)  # Удаление лишних пробелов
-    text = re.sub(r'[^\w\s.,!?—–-]', '', text)  # Удаление специальных символов, кроме базовых
-    return text.strip()
+    text = _SPECIAL_CHARS.sub('', text)  # Удаление специальных символов, кроме базовых
+    return ' '.join(text.split())  # Удаление лишних пробелов (включая оставшиеся после удаления символов)
+
+
+# Граница предложений: пробелы после . ! или ?
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+
+def _iter_sentence_spans(text):
+    """Ленивое разбиение текста на предложения: выдаёт пары (начало, конец) без создания подстрок."""
+    start = 0
+    for match in _SENT_SPLIT.finditer(text):
+        yield start, match.start()
+        start = match.end()
+    yield start, len(text)
 
 
 def chunk_text(text, chunk_size=500, overlap_sentences=3):
     """Разделение текста на чанки по примерно chunk_size символов с нахлестом в overlap_sentences предложений."""
-    sentences = re.split(r'(?<=[.!?])\s+', text)
     chunks = []
-    current_chunk_sentences = []
+    current_chunk_spans = []
     current_length = 0
-    overlap = []
+    # Последние overlap_sentences предложений — нахлест для следующего чанка
+    overlap = deque(maxlen=overlap_sentences)
 
-    for sentence in sentences:
-        if overlap:
-            current_chunk_sentences.extend(overlap)
-            current_length += sum(len(s) + 1 for s in overlap)
-            overlap = []
+    for span in _iter_sentence_spans(text):
+        if not current_chunk_spans and overlap:
+            current_chunk_spans.extend(overlap)
+            current_length = sum(end - start + 1 for start, end in overlap)
 
-        current_chunk_sentences.append(sentence)
-        current_length += len(sentence) + 1
+        current_chunk_spans.append(span)
+        current_length += span[1] - span[0] + 1
+        overlap.append(span)
 
         if current_length >= chunk_size:
-            chunk_text_str = ' '.join(current_chunk_sentences)
-            chunks.append(chunk_text_str)
-            if len(current_chunk_sentences) >= overlap_sentences:
-                overlap = current_chunk_sentences[-overlap_sentences:]
-            else:
-                overlap = current_chunk_sentences[:]
-            current_chunk_sentences = []
+            chunks.append(' '.join(text[start:end] for start, end in current_chunk_spans))
+            current_chunk_spans = []
             current_length = 0
 
-    if current_chunk_sentences:
-        chunks.append(' '.join(current_chunk_sentences))
+    if current_chunk_spans:
+        chunks.append(' '.join(text[start:end] for start, end in current_chunk_spans))
 
     return chunks
 
 
-def summarize_chunk(chunk, level=1, summary_file=None):
-    """Суммаризация одного чанка с системным сообщением для русского языка."""
-    system_message = {"role": "system",
-                      "content": """Ты — русскоязычный ассистент. Все ответы давай на русском языке. 
-                                 Не используй английский. Используй ТОЛЬКО Фрагмент ниже.
-                                 ВАЖНО: Не используй теги <think>, <reasoning> или другие мета-рассуждения.
-                                 Не объясняй свои мысли. Просто дай суммаризацию на русском языке."""}
+# Английские служебные слова для проверки языка суммаризаций
+_EN_STOPWORDS = frozenset(('the', 'and', 'of', 'to', 'in', 'that', 'it', 'with', 'as', 'for'))
+
+
+def is_english(text):
+    """
+    Проверка, что модель перешла на английский: в тексте не меньше 3 английских служебных слов
+    и они составляют больше 5% слов. Минимум совпадений не даёт одному случайному слову
+    сработать на коротком начале потоковой генерации.
+    """
+    words = text.lower().split()
 
+    if len(words) <= 10:  # Проверяем только если текст достаточно длинный
+        return False
+
+    english_word_count = sum(1 for word in words if word.strip('.,!?;:"\'()«»—–-') in _EN_STOPWORDS)
+    return english_word_count >= 3 and english_word_count / len(words) > 0.05
+
+
+def build_chunk_messages(chunk, level=1):
+    """Формирование сообщений для суммаризации одного чанка."""
     prompt = f"""Суммируй этот фрагмент текста на русском языке в 5-6 предложениях, включая сюжет, ключевые события, персонажей, диалоги и темы. 
     Фрагмент: {chunk}
 
@@ -160,44 +293,70 @@ def summarize_chunk(chunk, level=1, summary_file=None):
     НЕ используй теги <think>, <reasoning> или другие мета-рассуждения.
     Используй только текст из контента ниже."""
 
-    messages = [
-        system_message,
+    return [
+        SYS_SUMMARIZE,
         {"role": "user", "content": prompt}
     ]
 
-    response = llm.create_chat_completion(
+
+def summarize_chunk(chunk, level=1, summary_file=None, messages=None):
+    """Суммаризация одного чанка с системным сообщением для русского языка."""
+    if messages is None:
+        messages = build_chunk_messages(chunk, level)
+    # Потоковая генерация: язык проверяется по мере появления слов, и при уходе модели
+    # в английский генерация прерывается, не дожидаясь исчерпания max_tokens
+    stream = llm.create_chat_completion(
         messages=messages,
-        max_tokens=600,
+        max_tokens=400,  # 5-6 предложений
         temperature=0.1,
-        stop=["</s>", "Human:", "<think>", "<reasoning>", "<scratchpad>", "Ok", "So,", "First,"]
+        stop=["</s>", "Human:", "<think>", "<reasoning>", "<scratchpad>", "Ok", "So,", "First,"],
+        stream=True
     )
 
-    summary = response['choices'][0]['message']['content'].strip()
+    parts = []
+    drifted = False
+    for delta in stream:
+        piece = delta['choices'][0]['delta'].get('content') or ''
+        parts.append(piece)
+        if any(ch.isspace() for ch in piece) and is_english(''.join(parts)):
+            drifted = True
+            stream.close()
+            break
+
+    summary = ''.join(parts).strip()
 
     # Очищаем вывод от внутренних рассуждений
     summary = clean_model_output(summary)
 
     # Запись в файл суммаризаций
     if summary_file:
-        summary_file.write(f"\n{'=' * 80}\n")
-        summary_file.write(f"ЧАНК (уровень {level}):\n")
-        summary_file.write(f"{chunk[:500]}...\n\n" if len(chunk) > 500 else f"{chunk}\n\n")
-        summary_file.write(f"СУММАРИЗАЦИЯ ЧАНКА:\n")
-        summary_file.write(f"{summary}\n")
-        summary_file.write(f"{'=' * 80}\n\n")
-
-    # Проверка на английский язык
-    english_words = ['the', 'and', 'of', 'to', 'a', 'in', 'that', 'it', 'with', 'as', 'for']
-    word_count = len(summary.split())
-
-    if word_count > 10:  # Проверяем только если текст достаточно длинный
-        english_word_count = sum(1 for word in english_words if word in summary.lower().split())
-        if english_word_count > 2:  # Если найдено больше 2 английских слов
-            print("⚠️ Обнаружен английский в сводке чанка. Перегенерирую...")
-            if summary_file:
-                summary_file.write("⚠️ Обнаружен английский в сводке чанка. Перегенерирую...\n")
+        summary_file.write("".join([
+            f"\n{'=' * 80}\n",
+            f"ЧАНК (уровень {level}):\n",
+            f"{chunk[:500]}...\n\n" if len(chunk) > 500 else f"{chunk}\n\n",
+            f"СУММАРИЗАЦИЯ ЧАНКА:\n",
+            f"{summary}\n",
+            f"{'=' * 80}\n\n",
+        ]))
+
+    # Проверка на английский язык (или генерация уже прервана из-за него)
+    if drifted or is_english(summary):
+        print("⚠️ Обнаружен английский в сводке чанка. Перегенерирую...")
+        if summary_file:
+            summary_file.write("⚠️ Обнаружен английский в сводке чанка. Перегенерирую...\n")
+
+        if drifted:
+            # Генерация прервана на середине, и суммаризация покрывает только начало фрагмента:
+            # суммаризируем сам чанк заново с более строгим требованием русского языка
+            chunk_messages = build_chunk_messages(chunk, level)
+            strict_messages = [
+                chunk_messages[0],
+                {"role": "user", "content": chunk_messages[1]["content"] + """
 
-            # Более строгий промпт для перегенерации
+    Пиши на чистом русском языке без английских слов. Только русский язык!"""}
+            ]
+        else:
+            # Более строгий промпт для перегенерации полной суммаризации
             strict_prompt = f"""Перепиши эту суммаризацию на русском языке:
             Исходная суммаризация: {summary}
 
@@ -206,127 +365,217 @@ def summarize_chunk(chunk, level=1, summary_file=None):
             Только русский язык!"""
 
             strict_messages = [
-                system_message,
+                SYS_SUMMARIZE,
                 {"role": "user", "content": strict_prompt}
             ]
 
-            response = llm.create_chat_completion(
-                messages=strict_messages,
-                max_tokens=600,
-                temperature=0.3,
-                stop=["</s>", "Human:", "<think>"]
-            )
+        response = llm.create_chat_completion(
+            messages=strict_messages,
+            max_tokens=400,
+            temperature=0.3,
+            stop=["</s>", "Human:", "<think>"]
+        )
 
-            summary = response['choices'][0]['message']['content'].strip()
-            summary = clean_model_output(summary)
+        summary = response['choices'][0]['message']['content'].strip()
+        summary = clean_model_output(summary)
 
-            if summary_file:
-                summary_file.write(f"ИСПРАВЛЕННАЯ СУММАРИЗАЦИЯ:\n{summary}\n\n")
+        if summary_file:
+            summary_file.write(f"ИСПРАВЛЕННАЯ СУММАРИЗАЦИЯ:\n{summary}\n\n")
 
     print(summary[:200] + "..." if len(summary) > 200 else summary)
     return summary
 
 
-def hierarchical_summarize(summaries, max_group_size=5, level=1, summary_file=None, log_file=None):
-    """Иерархическая суммаризация с рекурсией."""
-    if log_file:
-        log_file.write(f"=== Уровень {level}: Обработка {len(summaries)} суммаризаций ===\n")
-        for idx, summ in enumerate(summaries):
-            log_file.write(f"Суммаризация {idx + 1}: {summ[:100]}...\n")
-        log_file.write("\n")
+def _run_jobs(func, jobs, pool=None):
+    """
+    Выполнение задач в пуле процессов или последовательно в текущем процессе.
+
+    В пуле результаты возвращаются в порядке готовности, поэтому каждая задача
+    должна возвращать свой индекс.
+    """
+    if pool is not None:
+        return pool.imap_unordered(func, jobs)
+
+    if llm is None:
+        load_model()
+    return map(func, jobs)
+
+
+def _summarize_one(job):
+    """
+    Суммаризация одного чанка (выполняется в основном процессе или в процессе пула).
+
+    Записи для файла суммаризаций накапливаются в буфере и возвращаются вместе с результатом,
+    чтобы в файл писал только основной процесс.
+    """
+    i, total, chunk, messages, level = job
+
+    report = io.StringIO()
+    report.write(f"\n{'=' * 80}\n")
+    report.write(f"ОБРАБОТКА ЧАНКА {i + 1} из {total}\n")
+    report.write(f"{'=' * 80}\n")
 
+    # Имя файла модели входит в ключ, как и в кэше ответов: после смены модели чанки пересчитываются
+    key = hashlib.sha256(
+        f"{os.path.basename(model_path)}:{PROMPT_VER}:{level}:{chunk}".encode('utf-8')).hexdigest()
+    cache_path = os.path.join(CHUNKS_CACHE_DIR, f"{key}.txt")
+
+    if os.path.exists(cache_path):
+        print(f"Чанк {i + 1}/{total} взят из кэша.")
+        with open(cache_path, 'r', encoding='utf-8') as cache_f:
+            summary = cache_f.read()
+        report.write(f"СУММАРИЗАЦИЯ ЧАНКА (из кэша):\n{summary}\n\n")
+        return i, summary, report.getvalue()
+
+    print(f"Суммаризирую чанк {i + 1}/{total}...")
+    summary = summarize_chunk(chunk, level=level, summary_file=report, messages=messages)
+
+    # Запись через временный файл (свой у каждого процесса пула), чтобы прерванный запуск
+    # не оставил в кэше обрезанную суммаризацию
+    os.makedirs(CHUNKS_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as cache_f:
+        cache_f.write(summary)
+    os.replace(tmp_path, cache_path)
+
+    return i, summary, report.getvalue()
+
+
+def summarize_chunks(chunks, level=1, summary_file=None, pool=None):
+    """
+    Суммаризация списка чанков.
+
+    Сначала для всех чанков формируются сообщения, затем они отправляются в модель: по очереди
+    в текущем процессе или параллельно в пуле процессов, каждый со своей копией модели.
+
+    :param chunks: Список чанков текста
+    :param level: Уровень детализации
+    :param summary_file: Файл для записи подробных суммаризаций
+    :param pool: Пул процессов (multiprocessing.Pool с инициализатором load_model) или None
+    :return: Список суммаризаций в порядке чанков
+    """
+    jobs = [(i, len(chunks), chunk, build_chunk_messages(chunk, level), level)
+            for i, chunk in enumerate(chunks)]
+    summaries = [""] * len(chunks)
+
+    # Результаты приходят в порядке готовности, раскладываем их по индексам чанков
+    for i, summary, report in _run_jobs(_summarize_one, jobs, pool):
+        if summary_file:
+            summary_file.write(report)
+            summary_file.flush()  # Сбрасываем на диск после каждого чанка, чтобы не потерять их при сбое
+        summaries[i] = summary
+        print(f"✅ Чанк {i + 1} готов: {len(summary)} символов.")
+
+    return summaries
+
+
+def summarize_group(summaries, level=1, summary_file=None, log_file=None):
+    """Суммаризация одной группы суммаризаций в более обобщённую сводку."""
     if len(summaries) <= 1:
         if log_file:
             log_file.write(f"Уровень {level}: Мало суммаризаций, возвращаем как есть.\n\n")
         return summaries[0] if summaries else ""
 
-    if len(summaries) <= max_group_size:
-        combined = "\n\n".join(summaries)
+    combined = "\n\n".join(summaries)
 
-        system_message = {"role": "system",
-                          "content": """Ты — русскоязычный ассистент. Все ответы давай на русском языке. 
-                                     Не используй английский. 
-                                     ВАЖНО: Не используй теги <think>, <reasoning> или другие мета-рассуждения.
-                                     Не объясняй свои мысли. Просто дай суммаризацию."""}
+    prompt = f"""На основе ТОЛЬКО этих Суммаризаций, создай более обобщённую сводку на русском языке. 
+    Суммаризации: {combined}
 
-        prompt = f"""На основе ТОЛЬКО этих Суммаризаций, создай более обобщённую сводку на русском языке. 
-        Суммаризации: {combined}
+    Сводка должна объединить сюжет, ключевые идеи, сохраняя последовательность сюжета. 
+    Уровень детализации: {level}. 
+    ОТВЕЧАЙ ТОЛЬКО НА РУССКОМ ЯЗЫКЕ, в 5-8 предложениях.
+    НЕ используй теги <think>, <reasoning> или другие мета-рассуждения."""
 
-        Сводка должна объединить сюжет, ключевые идеи, сохраняя последовательность сюжета. 
-        Уровень детализации: {level}. 
-        ОТВЕЧАЙ ТОЛЬКО НА РУССКОМ ЯЗЫКЕ, в 5-8 предложениях.
-        НЕ используй теги <think>, <reasoning> или другие мета-рассуждения."""
+    messages = [
+        SYS_HIER,
+        {"role": "user", "content": prompt}
+    ]
 
-        messages = [
-            system_message,
-            {"role": "user", "content": prompt}
-        ]
+    super_summary = cached_chat_completion(
+        llm,
+        messages=messages,
+        max_tokens=500,  # 5-8 предложений
+        temperature=0.1,
+        stop=["</s>", "Human:", "<think>", "<reasoning>"]
+    )
+    super_summary = clean_model_output(super_summary)
 
-        response = llm.create_chat_completion(
-            messages=messages,
-            max_tokens=800,
-            temperature=0.1,
-            stop=["</s>", "Human:", "<think>", "<reasoning>"]
-        )
+    # Запись иерархической суммаризации в файл
+    if summary_file:
+        summary_file.write(f"\n{'#' * 80}\n")
+        summary_file.write(f"ИЕРАРХИЧЕСКАЯ СУММАРИЗАЦИЯ (уровень {level}):\n")
+        summary_file.write(f"Количество исходных суммаризаций: {len(summaries)}\n")
+        summary_file.write(f"Результат:\n{super_summary}\n")
+        summary_file.write(f"{'#' * 80}\n\n")
 
-        super_summary = response['choices'][0]['message']['content'].strip()
-        super_summary = clean_model_output(super_summary)
+    if log_file:
+        log_file.write(
+            f"Уровень {level}: Суммирована группа из {len(summaries)} в супер-суммаризацию: {super_summary[:200]}...\n\n")
 
-        # Запись иерархической суммаризации в файл
-        if summary_file:
-            summary_file.write(f"\n{'#' * 80}\n")
-            summary_file.write(f"ИЕРАРХИЧЕСКАЯ СУММАРИЗАЦИЯ (уровень {level}):\n")
-            summary_file.write(f"Количество исходных суммаризаций: {len(summaries)}\n")
-            summary_file.write(f"Результат:\n{super_summary}\n")
-            summary_file.write(f"{'#' * 80}\n\n")
+    print(f"Уровень {level}: {super_summary[:200]}...")
+    return super_summary
 
-        if log_file:
-            log_file.write(
-                f"Уровень {level}: Суммирована группа из {len(summaries)} в супер-суммаризацию: {super_summary[:200]}...\n\n")
 
-        print(f"Уровень {level}: {super_summary[:200]}...")
-        return super_summary
+def _summarize_group_job(job):
+    """Суммаризация группы в основном процессе или в процессе пула; записи для файлов возвращаются в буферах."""
+    i, group, level = job
+    report = io.StringIO()
+    log = io.StringIO()
+    super_summary = summarize_group(group, level, report, log)
+    return i, super_summary, report.getvalue(), log.getvalue()
 
-    # Рекурсия: разделяем на группы
-    groups = [summaries[i:i + max_group_size] for i in range(0, len(summaries), max_group_size)]
 
-    if log_file:
-        log_file.write(f"\nУровень {level}: Разделено на {len(groups)} групп по {max_group_size}.\n")
-        for g_idx, group in enumerate(groups):
-            log_file.write(f"  Группа {g_idx + 1}: {len(group)} суммаризаций\n")
-        log_file.write("\n")
+def hierarchical_summarize(summaries, max_group_size=5, level=1, summary_file=None, log_file=None, pool=None):
+    """
+    Иерархическая суммаризация снизу вверх.
 
-    super_summaries = []
+    Суммаризации разбиваются на группы по max_group_size, каждая группа сворачивается в одну
+    супер-суммаризацию, и так уровень за уровнем, пока всё не поместится в одну группу.
+    Итоговая группа сворачивается в финальную сводку. Группы одного уровня независимы,
+    поэтому при переданном pool они суммаризируются параллельно.
+    """
+    while len(summaries) > max_group_size:
+        groups = [summaries[i:i + max_group_size] for i in range(0, len(summaries), max_group_size)]
 
-    for group in groups:
-        super_summary = hierarchical_summarize(group, max_group_size, level + 1, summary_file, log_file)
-        super_summaries.append(super_summary)
+        if log_file:
+            log_file.write(f"=== Уровень {level}: Обработка {len(summaries)} суммаризаций ===\n")
+            for idx, summ in enumerate(summaries):
+                log_file.write(f"Суммаризация {idx + 1}: {summ[:100]}...\n")
+            log_file.write(f"\nУровень {level}: Разделено на {len(groups)} групп по {max_group_size}.\n")
+            for g_idx, group in enumerate(groups):
+                log_file.write(f"  Группа {g_idx + 1}: {len(group)} суммаризаций\n")
+            log_file.write("\n")
+
+        super_summaries = [""] * len(groups)
+        jobs = [(g_idx, group, level) for g_idx, group in enumerate(groups)]
+        for g_idx, super_summary, report, log in _run_jobs(_summarize_group_job, jobs, pool):
+            if summary_file:
+                summary_file.write(report)
+            if log_file:
+                log_file.write(log)
+            super_summaries[g_idx] = super_summary
+            print(f"Добавлена супер-суммаризация группы {g_idx + 1}: {super_summary[:100]}...")
 
         if log_file:
-            log_file.write(f"Уровень {level}: Добавлена супер-суммаризация группы: {super_summary[:200]}...\n")
-            log_file.write(f"\nИтого по группе super_summaries: {len(super_summaries)} элементов\n")
+            log_file.write(f"Уровень {level}: Итого super_summaries: {len(super_summaries)} элементов\n\n")
 
-        print(f"Добавлена супер-суммаризация: {super_summary[:100]}...")
+        summaries = super_summaries
+        level += 1
 
-    # Объединение супер-суммаризаций в повествование
-    comb = combine_into_narrative(llm, super_summaries)
+    if log_file:
+        log_file.write(f"=== Уровень {level}: Финальная группа из {len(summaries)} суммаризаций ===\n")
+        for idx, summ in enumerate(summaries):
+            log_file.write(f"Суммаризация {idx + 1}: {summ[:100]}...\n")
+        log_file.write("\n")
 
+    _, final, report, log = next(_run_jobs(_summarize_group_job, [(0, summaries, level)], pool))
     if summary_file:
-        summary_file.write(f"\n{'@' * 80}\n")
-        summary_file.write(f"ОБЪЕДИНЕНИЕ СУПЕР-СУММАРИЗАЦИЙ (уровень {level}):\n")
-        summary_file.write(f"Исходные супер-суммаризации: {len(super_summaries)}\n")
-        for i, summ in enumerate(super_summaries):
-            summary_file.write(f"\nСупер-суммаризация {i + 1}:\n{summ[:300]}...\n" if len(
-                summ) > 300 else f"\nСупер-суммаризация {i + 1}:\n{summ}\n")
-        summary_file.write(f"\nОбработанный список (объединенное повествование):\n{comb}\n")
-        summary_file.write(f"{'@' * 80}\n\n")
-
-    # Рекурсивно суммаризируем супер-суммаризации
-    final = hierarchical_summarize(super_summaries, max_group_size, level, summary_file, log_file)
-    final = clean_model_output(final)
+        summary_file.write(report)
+    if log_file:
+        log_file.write(log)
 
     if log_file:
-        log_file.write(f"Уровень {level}: Финальная рекурсивная суммаризация супер-групп завершена.\n\n")
+        log_file.write(f"Уровень {level}: Иерархическая суммаризация завершена.\n\n")
         log_file.write(f"Финальная суммаризация: {final[:500]}...\n")
 
     return final
@@ -341,152 +590,145 @@ def main():
     final_output_file = "Output_summary.txt"
     log_file_path = "hierarchical_log.txt"
 
-    # Открываем файлы для записи
-    summary_file = open(summary_output_file, 'w', encoding='utf-8')
-    final_file = open(final_output_file, 'w', encoding='utf-8')
-    log_file = open(log_file_path, "w", encoding="utf-8")
-
-    # Заголовки файлов
-    summary_file.write("=" * 100 + "\n")
-    summary_file.write("ПОДРОБНАЯ СУММАРИЗАЦИЯ ТЕКСТА\n")
-    summary_file.write("=" * 100 + "\n\n")
-
-    final_file.write("=" * 100 + "\n")
-    final_file.write("ИТОГОВАЯ СУММАРИЗАЦИЯ ТЕКСТА\n")
-    final_file.write("ВСЕ РАССУЖДЕНИЯ И ТЕГИ УДАЛЕНЫ\n")
-    final_file.write("=" * 100 + "\n\n")
-
-    log_file.write("Лог иерархической суммаризации\n\n")
-
-    # Чтение файла с книгой
-    book_file = r"G:\books\Master_i_Margarita.txt"
-
-    if not os.path.exists(book_file):
-        print(f"❌ Файл {book_file} не найден!")
-        summary_file.close()
-        final_file.close()
-        log_file.close()
-        return
-
-    try:
-        with open(book_file, 'r', encoding='cp1251') as book_f:
-            full_text = book_f.read()
-    except UnicodeDecodeError:
-        with open(book_file, 'r', encoding='utf-8') as book_f:
-            full_text = book_f.read()
-
-    full_text = clean_text(full_text)
-    print(f"📖 Текст загружен: {len(full_text)} символов.")
-    summary_file.write(f"📖 Исходный текст загружен: {len(full_text)} символов.\n\n")
-
-    # Разделение на чанки
-    chunks = chunk_text(full_text, chunk_size=3000)
-    print(f"🔢 Текст разделён на {len(chunks)} чанков.")
-    summary_file.write(f"🔢 Текст разделён на {len(chunks)} чанков.\n\n")
-
-    # Суммаризация чанков
-    summaries = []
-    for i, chunk in enumerate(chunks):
-        print(f"Суммаризирую чанк {i + 1}/{len(chunks)}...")
-        summary_file.write(f"\n{'=' * 80}\n")
-        summary_file.write(f"ОБРАБОТКА ЧАНКА {i + 1} из {len(chunks)}\n")
-        summary_file.write(f"{'=' * 80}\n")
-
-        summary = summarize_chunk(chunk, level=1, summary_file=summary_file)
-        summaries.append(summary)
-        print(f"✅ Чанк {i + 1} готов: {len(summary)} символов.")
+    # Открываем файлы для записи (с буфером 1 МБ, чтобы мелкие записи не превращались в отдельные системные вызовы).
+    # ExitStack гарантирует сброс буферов и закрытие файлов, даже если обработка прервётся с ошибкой.
+    with ExitStack() as stack:
+        summary_file = stack.enter_context(open(summary_output_file, 'w', encoding='utf-8', buffering=1 << 20))
+        final_file = stack.enter_context(open(final_output_file, 'w', encoding='utf-8', buffering=1 << 20))
+        log_file = stack.enter_context(open(log_file_path, "w", encoding="utf-8", buffering=1 << 20))
+
+        # Заголовки файлов
+        summary_file.write("=" * 100 + "\n")
+        summary_file.write("ПОДРОБНАЯ СУММАРИЗАЦИЯ ТЕКСТА\n")
+        summary_file.write("=" * 100 + "\n\n")
+
+        final_file.write("=" * 100 + "\n")
+        final_file.write("ИТОГОВАЯ СУММАРИЗАЦИЯ ТЕКСТА\n")
+        final_file.write("ВСЕ РАССУЖДЕНИЯ И ТЕГИ УДАЛЕНЫ\n")
+        final_file.write("=" * 100 + "\n\n")
+
+        log_file.write("Лог иерархической суммаризации\n\n")
+
+        # Чтение файла с книгой
+        book_file = r"G:\books\Master_i_Margarita.txt"
+
+        if not os.path.exists(book_file):
+            print(f"❌ Файл {book_file} не найден!")
+            return
+
+        try:
+            with open(book_file, 'r', encoding='cp1251') as book_f:
+                full_text = book_f.read()
+        except UnicodeDecodeError:
+            with open(book_file, 'r', encoding='utf-8') as book_f:
+                full_text = book_f.read()
+
+        full_text = clean_text(full_text)
+        print(f"📖 Текст загружен: {len(full_text)} символов.")
+        summary_file.write(f"📖 Исходный текст загружен: {len(full_text)} символов.\n\n")
+
+        # Разделение на чанки
+        chunks = chunk_text(full_text, chunk_size=3000)
+        print(f"🔢 Текст разделён на {len(chunks)} чанков.")
+        summary_file.write(f"🔢 Текст разделён на {len(chunks)} чанков.\n\n")
+
+        # Пул процессов, каждый со своей копией модели, для суммаризации чанков и групп
+        pool = None
+        if n_workers > 1:
+            pool = stack.enter_context(multiprocessing.Pool(
+                n_workers, initializer=load_model,
+                initargs=(max(1, n_threads // n_workers),)))  # Делим потоки CPU между процессами
+
+        # Суммаризация чанков
+        summaries = summarize_chunks(chunks, level=1, summary_file=summary_file, pool=pool)
+
+        # Иерархическая суммаризация
+        print("🏗️ Начинаю иерархическую суммаризацию...")
+        summary_file.write("\n\n" + "=" * 100 + "\n")
+        summary_file.write("НАЧАЛО ИЕРАРХИЧЕСКОЙ СУММАРИЗАЦИИ\n")
+        summary_file.write("=" * 100 + "\n\n")
+
+        final_summary = hierarchical_summarize(summaries, summary_file=summary_file, log_file=log_file, pool=pool)
+
+        # Освобождаем память процессов пула перед загрузкой модели в основном процессе
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if llm is None:
+            load_model()
+
+        # Финальная общая сводка
+        print("📝 Создаю финальную общую сводку...")
+        final_prompt = f"""На основе ТОЛЬКО ЭТОЙ иерархической сводки, создай полную общую сводку в 10-20 предложениях на русском языке. 
+        Иерархическая сводка: {final_summary}
+
+        Сводка должна охватывать сюжет, основные темы, ключевых персонажей и сюжетные повороты. 
+        Из общей сводки должны быть понятны сюжет, сюжетные повороты и ключевые персонажи. 
+        ОТВЕЧАЙ ТОЛЬКО НА РУССКОМ ЯЗЫКЕ.
+        НЕ используй теги <think>, <reasoning> или другие мета-рассуждения."""
+
+        messages = [
+            SYS_FINAL,
+            {"role": "user", "content": final_prompt}
+        ]
+
+        response = llm.create_chat_completion(
+            messages=messages,
+            max_tokens=900,  # 10-20 предложений
+            temperature=0.1,
+            stop=["</s>", "Human:", "<think>", "<reasoning>", "Ok,", "So,", "First,"]
+        )
 
-    # Иерархическая суммаризация
-    print("🏗️ Начинаю иерархическую суммаризацию...")
-    summary_file.write("\n\n" + "=" * 100 + "\n")
-    summary_file.write("НАЧАЛО ИЕРАРХИЧЕСКОЙ СУММАРИЗАЦИИ\n")
-    summary_file.write("=" * 100 + "\n\n")
+        overall_summary = response['choices'][0]['message']['content'].strip()
+        overall_summary = clean_model_output(overall_summary)
 
-    final_summary = hierarchical_summarize(summaries, summary_file=summary_file, log_file=log_file)
+        # Запись результатов в final_file (итоговый файл)
+        final_file.write("=== ОБЩАЯ СВОДКА (ОЧИЩЕНА ОТ РАССУЖДЕНИЙ) ===\n\n")
+        final_file.write(overall_summary)
+        final_file.write("\n\n" + "=" * 80 + "\n\n")
 
-    # Финальная общая сводка
-    print("📝 Создаю финальную общую сводку...")
-    system_message = {"role": "system",
-                      "content": """Ты — русскоязычный ассистент. Все ответы давай на русском языке. 
-                                 Не используй английский. 
-                                 ВАЖНО: Не используй теги <think>, <reasoning> или другие мета-рассуждения.
-                                 Не объясняй свои мысли. Просто дай суммаризацию."""}
+        final_file.write("=== ИЕРАРХИЧЕСКАЯ СВОДКА (ОЧИЩЕНА ОТ РАССУЖДЕНИЙ) ===\n\n")
+        final_file.write(final_summary)
+        final_file.write("\n\n" + "=" * 80 + "\n\n")
 
-    final_prompt = f"""На основе ТОЛЬКО ЭТОЙ иерархической сводки, создай полную общую сводку в 10-20 предложениях на русском языке. 
-    Иерархическая сводка: {final_summary}
+        final_file.write("=== ПРЕДВАРИТЕЛЬНЫЕ СУММАРИЗАЦИИ ЧАНКОВ ===\n")
+        for i, summ in enumerate(summaries):
+            final_file.write(f"\n{'=' * 60}\n")
+            final_file.write(f"Чанк {i + 1}:\n")
+            cleaned_summ = clean_model_output(summ)
+            final_file.write(f"{cleaned_summ}\n")
 
-    Сводка должна охватывать сюжет, основные темы, ключевых персонажей и сюжетные повороты. 
-    Из общей сводки должны быть понятны сюжет, сюжетные повороты и ключевые персонажи. 
-    ОТВЕЧАЙ ТОЛЬКО НА РУССКОМ ЯЗЫКЕ.
-    НЕ используй теги <think>, <reasoning> или другие мета-рассуждения."""
+        # Запись результатов в summary_file (подробный файл)
+        summary_file.write("\n\n" + "*" * 100 + "\n")
+        summary_file.write("ФИНАЛЬНЫЕ РЕЗУЛЬТАТЫ\n")
+        summary_file.write("*" * 100 + "\n\n")
 
-    messages = [
-        system_message,
-        {"role": "user", "content": final_prompt}
-    ]
+        summary_file.write("=== ИТОГОВАЯ ОБЩАЯ СВОДКА (ОЧИЩЕНА) ===\n\n")
+        summary_file.write(overall_summary)
+        summary_file.write("\n\n" + "=" * 80 + "\n\n")
 
-    response = llm.create_chat_completion(
-        messages=messages,
-        max_tokens=1600,
-        temperature=0.1,
-        stop=["</s>", "Human:", "<think>", "<reasoning>", "Ok,", "So,", "First,"]
-    )
+        summary_file.write("=== ФИНАЛЬНАЯ ИЕРАРХИЧЕСКАЯ СВОДКА (ОЧИЩЕНА) ===\n\n")
+        summary_file.write(final_summary)
+
+        print(f"🎉 Сводка сохранена в {final_output_file}")
+        print(f"📋 Подробная суммаризация сохранена в {summary_output_file}")
+        print(f"📝 Лог сохранен в {log_file_path}")
+
+        print("\n--- Превью финальной сводки ---")
+        print(overall_summary[:500] + "..." if len(overall_summary) > 500 else overall_summary)
+
+        # Конец измерения времени и вывод
+        end_time = time.time()
+        elapsed = end_time - start_time
+        elapsed_hours = elapsed / 3600
+
+        print(f"\nВремя исполнения программы: {elapsed:.2f} секунд ({elapsed_hours:.2f} часов).")
 
-    overall_summary = response['choices'][0]['message']['content'].strip()
-    overall_summary = clean_model_output(overall_summary)
-
-    # Запись результатов в final_file (итоговый файл)
-    final_file.write("=== ОБЩАЯ СВОДКА (ОЧИЩЕНА ОТ РАССУЖДЕНИЙ) ===\n\n")
-    final_file.write(overall_summary)
-    final_file.write("\n\n" + "=" * 80 + "\n\n")
-
-    final_file.write("=== ИЕРАРХИЧЕСКАЯ СВОДКА (ОЧИЩЕНА ОТ РАССУЖДЕНИЙ) ===\n\n")
-    final_file.write(final_summary)
-    final_file.write("\n\n" + "=" * 80 + "\n\n")
-
-    final_file.write("=== ПРЕДВАРИТЕЛЬНЫЕ СУММАРИЗАЦИИ ЧАНКОВ ===\n")
-    for i, summ in enumerate(summaries):
-        final_file.write(f"\n{'=' * 60}\n")
-        final_file.write(f"Чанк {i + 1}:\n")
-        cleaned_summ = clean_model_output(summ)
-        final_file.write(f"{cleaned_summ}\n")
-
-    # Запись результатов в summary_file (подробный файл)
-    summary_file.write("\n\n" + "*" * 100 + "\n")
-    summary_file.write("ФИНАЛЬНЫЕ РЕЗУЛЬТАТЫ\n")
-    summary_file.write("*" * 100 + "\n\n")
-
-    summary_file.write("=== ИТОГОВАЯ ОБЩАЯ СВОДКА (ОЧИЩЕНА) ===\n\n")
-    summary_file.write(overall_summary)
-    summary_file.write("\n\n" + "=" * 80 + "\n\n")
-
-    summary_file.write("=== ФИНАЛЬНАЯ ИЕРАРХИЧЕСКАЯ СВОДКА (ОЧИЩЕНА) ===\n\n")
-    summary_file.write(final_summary)
-
-    print(f"🎉 Сводка сохранена в {final_output_file}")
-    print(f"📋 Подробная суммаризация сохранена в {summary_output_file}")
-    print(f"📝 Лог сохранен в {log_file_path}")
-
-    print("\n--- Превью финальной сводки ---")
-    print(overall_summary[:500] + "..." if len(overall_summary) > 500 else overall_summary)
-
-    # Конец измерения времени и вывод
-    end_time = time.time()
-    elapsed = end_time - start_time
-    elapsed_hours = elapsed / 3600
-
-    print(f"\nВремя исполнения программы: {elapsed:.2f} секунд ({elapsed_hours:.2f} часов).")
-
-    # Запись времени в файлы
-    time_info = f"\n\nВремя исполнения программы: {elapsed:.2f} секунд ({elapsed_hours:.2f} часов)."
-    final_file.write(time_info)
-    summary_file.write(time_info)
-    log_file.write(time_info)
-
-    # Закрытие файлов
-    summary_file.close()
-    final_file.close()
-    log_file.close()
+        # Запись времени в файлы
+        time_info = f"\n\nВремя исполнения программы: {elapsed:.2f} секунд ({elapsed_hours:.2f} часов)."
+        final_file.write(time_info)
+        summary_file.write(time_info)
+        log_file.write(time_info)
 
 
 if __name__ == "__main__":